@@ -1,8 +1,30 @@
 import streamlit as st
 import uuid
-import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
+import logging
+import os
+import json
+import tempfile
+import re
+from pathlib import Path
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import RerunException, StopException
 from vertexai import agent_engines
 
+# LOG_LEVEL only applies to this app's logger, not to google-auth, grpc etc.
+logging.basicConfig()
+log = logging.getLogger(__name__)
+log_level = os.getenv("LOG_LEVEL", "WARNING").upper()
+if log_level in logging.getLevelNamesMapping():
+    log.setLevel(log_level)
+else:
+    log.setLevel(logging.WARNING)
+    log.warning("Unknown LOG_LEVEL %r, using WARNING", log_level)
+
 # Set page config
 st.set_page_config(
     page_title="Fraud Support Agent",
@@ -11,9 +33,9 @@ st.set_page_config(
 )
 
 # Custom CSS for styling assistant messages only
-st.markdown("""
+CUSTOM_CSS = """
 <style>
-.assistant-response {
+[data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarAssistant"]) [data-testid="stChatMessageContent"] {
     background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
     color: white;
     padding: 15px 20px;
@@ -22,37 +44,152 @@ st.markdown("""
     box-shadow: 0 2px 8px rgba(102, 126, 234, 0.2);
     border-left: 3px solid #4f46e5;
 }
+[data-testid="stChatMessage"]:has([data-testid="stChatMessageAvatarAssistant"]) [data-testid="stChatMessageContent"] :is(p, li, h1, h2, h3, h4, h5, h6, a) {
+    color: inherit;
+}
 </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource
+def inject_css():
+    """Inject the custom CSS, replaying the cached element on later reruns."""
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+inject_css()
 
 # Constants
 APP_NAME = "fraud_rag_agent"
 AGENT_ID = "3854843786517544960"  # Fraud RAG Agent ID
+MAX_VISIBLE = 20  # Number of recent messages rendered on every rerun
+# Saved conversations, one plaintext file per user. The only key to a file is
+# the user ID kept in the page URL, so anyone holding that URL (shared links,
+# browser history, proxy logs) can read and continue the conversation, and
+# nothing expires old files. Keep the directory out of images and backups.
+HISTORY_DIR = Path("./.chat_history")
+USER_ID_PATTERN = re.compile(r"user-[0-9a-f-]{36}")
+FENCE_PATTERN = re.compile(r" {0,3}(`{3,}|~{3,})(.*)")
+REF_DEF_PATTERN = re.compile(r" {0,3}\[[^\]]+\]:\s")  # Reference-style link definitions
+LIST_LINE_PATTERN = re.compile(r"\s|[-*+]\s|\d+[.)]\s")  # List items and continuations
+
+def history_path(user_id: str) -> Path:
+    """Get the file the user's conversation is saved to."""
+    return HISTORY_DIR / f"{user_id}.json"
+
+def load_history(user_id: str) -> dict:
+    """
+    Load the user's saved session ID and messages.
+    
+    Returns:
+        dict: The saved "session_id", "spare_session_id", "roles" and
+        "contents", empty if nothing was saved or the file is malformed
+    """
+    path = history_path(user_id)
+    if not path.exists():
+        return {}
+    try:
+        history = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        log.warning("Could not load chat history from %s: %s", path, e)
+        return {}
+    if not _is_valid_history(history):
+        log.warning("Ignoring malformed chat history in %s", path)
+        return {}
+    return history
+
+def _is_valid_history(history) -> bool:
+    """Check that loaded history has the shape save_history writes."""
+    if not isinstance(history, dict):
+        return False
+    session_id = history.get("session_id")
+    spare_session_id = history.get("spare_session_id")
+    roles = history.get("roles", [])
+    contents = history.get("contents", [])
+    return (
+        (session_id is None or isinstance(session_id, str))
+        and (spare_session_id is None or isinstance(spare_session_id, str))
+        and isinstance(roles, list)
+        and isinstance(contents, list)
+        and len(roles) == len(contents)
+        and all(isinstance(role, str) for role in roles)
+        and all(isinstance(content, str) for content in contents)
+    )
+
+def save_history():
+    """
+    Save the current session ID and messages for the user.
+    
+    Writes to a temporary file and swaps it into place, so two tabs on the
+    same user ID can't leave a half-written file behind.
+    """
+    HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=HISTORY_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({
+                "session_id": st.session_state.session_id,
+                "spare_session_id": st.session_state.spare_session_id,
+                "roles": st.session_state.roles,
+                "contents": st.session_state.contents,
+            }, f)
+        os.replace(tmp_path, history_path(st.session_state.user_id))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
 # Initialize session state variables
 if "user_id" not in st.session_state:
-    st.session_state.user_id = f"user-{uuid.uuid4()}"
+    # Keep the user ID in the URL so a refresh finds the saved conversation
+    user_id = st.query_params.get("user_id", "")
+    if not USER_ID_PATTERN.fullmatch(user_id):
+        user_id = f"user-{uuid.uuid4()}"
+    st.session_state.user_id = user_id
+    st.query_params["user_id"] = user_id
     
 if "session_id" not in st.session_state:
-    st.session_state.session_id = None
+    history = load_history(st.session_state.user_id)
+    st.session_state.session_id = history.get("session_id")
+    st.session_state.spare_session_id = history.get("spare_session_id")
+    st.session_state.roles = history.get("roles", [])
+    st.session_state.contents = history.get("contents", [])
     
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# Messages are kept as parallel lists of roles and contents
+if "roles" not in st.session_state:
+    st.session_state.roles = []
+    st.session_state.contents = []
 
 if "audio_files" not in st.session_state:
     st.session_state.audio_files = []
 
-if "waiting_for_response" not in st.session_state:
-    st.session_state.waiting_for_response = False
+if "stream_thread" not in st.session_state:
+    st.session_state.stream_q = None
+    st.session_state.stream_thread = None
+    st.session_state.stream_chunks = []
+
+if "pending_session" not in st.session_state:
+    st.session_state.pending_session = None
+
+@st.cache_resource
+def get_executor():
+    """Get the thread pool shared by all sessions for background API calls."""
+    return ThreadPoolExecutor(thread_name_prefix="agent")
+
+@st.cache_resource
+def get_remote_app(resource_id: str):
+    """
+    Get the deployed agent engine, building the client once per process.
+    
+    Args:
+        resource_id (str): The Agent Engine resource ID
+    """
+    return agent_engines.get(resource_id)
 
 def create_session(resource_id: str, user_id: str) -> bool:
     """
     Create a new session with the fraud rag agent.
     
     This function:
-    1. Generates a unique session ID based on timestamp
-    2. Sends a POST request to the ADK API to create a session
-    3. Updates the session state variables if successful
+    1. Sends a request to the Agent Engine to create a session
+    2. Updates the session state variables if successful
     
     Returns:
         bool: True if session was created successfully, False otherwise
@@ -60,103 +197,486 @@ def create_session(resource_id: str, user_id: str) -> bool:
     API Endpoint:
         POST /apps/{app_name}/users/{user_id}/sessions/{session_id}
     """
-    session_id = f"session-{int(time.time())}"
-    """Creates a new session for the specified user."""
-    remote_app = agent_engines.get(resource_id)
+    remote_app = get_remote_app(resource_id)
     remote_session = remote_app.create_session(user_id=user_id)
-    print("Created session:")
-    print(f"  Session ID: {remote_session['id']}")
-    print(f"  User ID: {remote_session['user_id']}")
-    print(f"  App name: {remote_session['app_name']}")
-    print(f"  Last update time: {remote_session['last_update_time']}")
-    print("\nUse this session ID with --session_id when sending messages.")
     
     if remote_session is not None:
-        st.session_state.session_id = remote_session['id']
-        st.session_state.messages = []
-        st.session_state.waiting_for_response = False
+        activate_session(_created_session_id(remote_session), new_conversation=True)
         return True
     else:
         st.error(f"Failed to create session for user {user_id}.")
         return False
 
-def send_message_to_api(message):
+def _created_session_id(remote_session):
+    """Log a session returned by the Agent Engine and get its ID."""
+    log.debug(
+        "Created session %s (user %s, app %s, last update %s)",
+        remote_session['id'],
+        remote_session['user_id'],
+        remote_session['app_name'],
+        remote_session['last_update_time'],
+    )
+    return remote_session['id']
+
+def activate_session(session_id, new_conversation=False):
     """
-    Send a message to the fraud rag agent and process the response.
+    Make a created session the active one.
     
-    This function:
-    1. Sends the message to the ADK API
-    2. Processes the response to extract text and audio information
-    3. Updates the chat history with the assistant's response
+    Args:
+        session_id (str): The ID of the session to activate
+        new_conversation (bool): Whether to clear the chat history first
+    """
+    if new_conversation:
+        st.session_state.roles = []
+        st.session_state.contents = []
+        clear_stream()
+    
+    st.session_state.session_id = session_id
+    save_history()
+
+def start_pending_session():
+    """Start creating a session in the background so it's ready when needed."""
+    st.session_state.pending_session = get_executor().submit(
+        get_remote_app(AGENT_ID).create_session,
+        user_id=st.session_state.user_id,
+    )
+
+def _wait_for_pending_session():
+    """
+    Wait for the background session, if any, and take it.
+    
+    Returns:
+        str | None: The created session's ID, or None if there was no
+        background session or creating it failed
+    """
+    future = st.session_state.pending_session
+    if future is None:
+        return None
+    st.session_state.pending_session = None
+    
+    try:
+        remote_session = future.result()
+    except Exception as e:
+        st.error(f"Failed to create session: {str(e)}")
+        return None
+    
+    if remote_session is None:
+        st.error(f"Failed to create session for user {st.session_state.user_id}.")
+        return None
+    return _created_session_id(remote_session)
+
+def claim_pending_session(new_conversation=False) -> bool:
+    """
+    Wait for the background session, if any, and make it the active one.
     
     Args:
-        message (str): The user's message to send to the agent
+        new_conversation (bool): Whether to clear the chat history first
         
     Returns:
-        bool: True if message was sent and processed successfully, False otherwise
+        bool: True if a session was activated, False otherwise
+    """
+    session_id = _wait_for_pending_session()
+    if session_id is None:
+        return False
+    activate_session(session_id, new_conversation=new_conversation)
+    return True
+
+def keep_spare_session():
+    """
+    Keep one spare session ready for "New Session" once the user is chatting.
     
-    API Endpoint:
-        POST /run
+    The spare's ID is saved with the history, so a refresh reuses it rather
+    than creating another one.
+    """
+    if st.session_state.session_id is None:
+        return
+    future = st.session_state.pending_session
+    if future is not None:
+        if future.done():
+            st.session_state.spare_session_id = _wait_for_pending_session()
+            save_history()
+    elif st.session_state.spare_session_id is None and st.session_state.roles:
+        start_pending_session()
+
+def _extract_model_text(event):
+    """
+    Get the model text from an ADK event.
+    
+    Args:
+        event (dict): An event yielded by stream_query
         
-    Response Processing:
-        - Parses the ADK event structure to extract text responses
-        - Looks for text_to_speech function responses to find audio file paths
-        - Adds both text and audio information to the chat history
+    Returns:
+        str | None: The text of the event's first part, or None if the event
+        isn't a model text response
     """
-    if not st.session_state.session_id:
-        st.error("No active session. Please create a session first.")
-        return False
+    content = event.get("content")
+    if not content or content.get("role") != "model":
+        return None
+    parts = content.get("parts")
+    if not parts:
+        return None
+    return parts[0].get("text")
+
+def _new_session():
+    """Create a new session for the current user, using the spare one if there is one."""
+    spare_session_id = st.session_state.spare_session_id
+    if spare_session_id is not None:
+        st.session_state.spare_session_id = None
+        activate_session(spare_session_id, new_conversation=True)
+        return
+    if claim_pending_session(new_conversation=True):
+        return
+    create_session(AGENT_ID, st.session_state.user_id)
+
+def stream_worker(q, remote_app, user_id, session_id, message):
+    """
+    Forward the agent's streamed text into a queue from a background thread.
+    
+    Runs off the Streamlit script thread so reruns don't abort the request
+    and the script thread never blocks inside the API call; a thread is used
+    rather than a coroutine because Streamlit scripts have no running event
+    loop to share the stream with. Puts each text part on the queue, any
+    exception raised by the API, and finally None to mark the end of the
+    stream.
     
+    Args:
+        q (queue.Queue): The queue drained by token_generator
+        remote_app: The deployed agent engine
+        user_id (str): The user ID owning the session
+        session_id (str): The session to send the message to
+        message (str): The user's message to send to the agent
+    """
     try:
-        """Sends a message to the deployed agent."""
-        remote_app = agent_engines.get(AGENT_ID)
-
-        print(f"Sending message to session {st.session_state.session_id}:")
-        print(f"Message: {message}")
-        print("\nResponse:")
         events = remote_app.stream_query(
-            user_id=st.session_state.user_id,
-            session_id=st.session_state.session_id,
+            user_id=user_id,
+            session_id=session_id,
             message=message,
         )
         
-        # Extract assistant's text response
-        assistant_message = None
-        
         for event in events:
-            print(event)  # Debug: print the event structure
-            # Look for the final text response from the model
-            if event.get("content", {}).get("role") == "model" and "text" in event.get("content", {}).get("parts", [{}])[0]:
-                assistant_message = event["content"]["parts"][0]["text"]
+            # Skip building the event repr entirely unless debugging
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Event: %r", event)
+            # Pass model text through as soon as it arrives
+            text = _extract_model_text(event)
+            if text:
+                q.put(text)
+    except Exception as e:
+        q.put(e)
+    finally:
+        q.put(None)
+
+def start_stream(message):
+    """
+    Start streaming the agent's response to a message in a background worker.
+    
+    Args:
+        message (str): The user's message to send to the agent
+    """
+    log.debug("Sending message to session %s: %s", st.session_state.session_id, message)
+    st.session_state.stream_q = queue.Queue()
+    st.session_state.stream_chunks = []
+    st.session_state.stream_thread = threading.Thread(
+        target=stream_worker,
+        args=(
+            st.session_state.stream_q,
+            get_remote_app(AGENT_ID),
+            st.session_state.user_id,
+            st.session_state.session_id,
+            message,
+        ),
+        daemon=True,
+    )
+    st.session_state.stream_thread.start()
+
+def clear_stream():
+    """Forget the in-flight stream, if any."""
+    st.session_state.stream_q = None
+    st.session_state.stream_thread = None
+    st.session_state.stream_chunks = []
+
+def token_generator():
+    """
+    Drain the in-flight stream's queue.
+    
+    Text received before a rerun is replayed first, so a rerun re-attaches to
+    the running request instead of sending the message again. Every part
+    already waiting in the queue is coalesced into one update, so the UI
+    refreshes at most once per render without ever holding text back.
+    
+    Yields:
+        str: Batches of the model's response text as they arrive
+    """
+    if st.session_state.stream_chunks:
+        yield "".join(st.session_state.stream_chunks)
+    
+    q = st.session_state.stream_q
+    thread = st.session_state.stream_thread
+    while True:
+        try:
+            items = [q.get(timeout=0.1)]
+        except queue.Empty:
+            # The end marker may already have been drained before a rerun
+            if not thread.is_alive() and q.empty():
+                return
+            continue
+        while items[-1] is not None:
+            try:
+                items.append(q.get_nowait())
+            except queue.Empty:
+                break
+        
+        texts = []
+        for item in items:
+            if isinstance(item, Exception):
+                raise item
+            if item is not None:
+                texts.append(item)
+        st.session_state.stream_chunks.extend(texts)
+        if texts:
+            yield "".join(texts)
+        if items[-1] is None:
+            return
+
+def _update_fence(fence, line):
+    """
+    Track ``` and ~~~ code fences one line at a time.
+    
+    Args:
+        fence (str | None): The marker of the open fence, or None
+        line (str): The next complete line
+        
+    Returns:
+        str | None: The marker of the fence open after the line, or None
+    """
+    match = FENCE_PATTERN.match(line)
+    if not match:
+        return fence
+    marker, info = match.groups()
+    if fence is None:
+        return marker
+    if marker[0] == fence[0] and len(marker) >= len(fence) and not info.strip():
+        return None
+    return fence
+
+def render_stream(chunks):
+    """
+    Render streamed text, only re-rendering the paragraph still being written.
+    
+    Completed paragraphs are frozen into their own markdown element and never
+    touched again. Text is scanned once, a line at a time, and is split at
+    the latest blank line that is outside a code fence and isn't followed by
+    a list item or indented line, since markdown reads those in context of
+    the text before the break. If the text defines reference-style links,
+    the whole response is re-rendered as one element at the end so the links
+    resolve.
+    
+    Args:
+        chunks (iterable): Text as it arrives
+    """
+    holder = st.empty()
+    box = holder.container()
+    live = box.empty()
+    parts = []    # Every chunk, joined only if the response has to be re-rendered
+    lines = []    # Complete lines since the last freeze
+    partial = []  # Pieces of the line still being written
+    fence = None
+    safe = -1     # Index in lines of the blank line at the latest safe break
+    frozen = False
+    has_ref_defs = False
+    
+    for chunk in chunks:
+        parts.append(chunk)
+        *complete, rest = chunk.split("\n")
+        for piece in complete:
+            partial.append(piece)
+            line = "".join(partial)
+            partial = []
+            if (
+                fence is None
+                and lines
+                and not lines[-1].strip()
+                and line.strip()
+                and not LIST_LINE_PATTERN.match(line)
+            ):
+                safe = len(lines) - 1
+            fence = _update_fence(fence, line)
+            has_ref_defs = has_ref_defs or bool(REF_DEF_PATTERN.match(line))
+            lines.append(line)
+        if rest:
+            partial.append(rest)
+        
+        if safe != -1:
+            # Freeze the completed paragraphs and start a new live element
+            live.markdown("\n".join(lines[:safe]))
+            live = box.empty()
+            lines = lines[safe + 1:]
+            safe = -1
+            frozen = True
+        live.markdown("\n".join(lines + ["".join(partial)]))
+    
+    if frozen and has_ref_defs:
+        holder.markdown("".join(parts))
+
+def receive_response():
+    """
+    Render the in-flight response and add it to the chat history.
+    
+    Returns:
+        bool: True if the response was received successfully, False otherwise
+    """
+    try:
+        with st.chat_message("assistant"):
+            render_stream(token_generator())
+        
+        # Join the received text parts once rather than concatenating per chunk
+        assistant_message = "".join(st.session_state.stream_chunks)
         
         # Add assistant response to chat
         if assistant_message:
-            st.session_state.messages.append({"role": "assistant", "content": assistant_message})
+            add_message("assistant", assistant_message)
         else:
-            st.session_state.messages.append({"role": "assistant", "content": "I received your message but couldn't generate a response."})
+            add_message("assistant", "I received your message but couldn't generate a response.")
         
+        clear_stream()
+        save_history()
+        keep_spare_session()
         return True
         
+    except (RerunException, StopException):
+        # A rerun mid-stream isn't an error; the next run re-attaches
+        raise
     except Exception as e:
         st.error(f"Error sending message: {str(e)}")
-        st.session_state.messages.append({"role": "assistant", "content": "Sorry, there was an error processing your request."})
+        add_message("assistant", "Sorry, there was an error processing your request.")
+        clear_stream()
+        save_history()
         return False
 
+def send_message_to_api(message):
+    """
+    Send a message to the fraud rag agent.
+    
+    This function:
+    1. Makes sure there is an active session, claiming the warmed-up one
+    2. Starts sending the message to the ADK API from a background worker
+    
+    The response is rendered and added to the chat history by
+    receive_response.
+    
+    Args:
+        message (str): The user's message to send to the agent
+        
+    Returns:
+        bool: True if the message was sent, False otherwise
+    
+    API Endpoint:
+        POST /run
+    """
+    if not st.session_state.session_id:
+        claim_pending_session()
+    if not st.session_state.session_id:
+        st.error("No active session. Please create a session first.")
+        return False
+    
+    start_stream(message)
+    return True
+
+def add_message(role, content):
+    """
+    Append a message to the chat history.
+    
+    Args:
+        role (str): "user" or "assistant"
+        content (str): The message text
+    """
+    st.session_state.roles.append(role)
+    st.session_state.contents.append(content)
+
 def handle_user_input(user_input):
     """
-    Handle user input by immediately adding it to chat and then processing the API call.
+    Handle user input by rendering it and streaming the API response in the same run.
     
     Args:
         user_input (str): The user's message
     """
-    # Immediately add user message to chat
-    st.session_state.messages.append({"role": "user", "content": user_input})
-    st.session_state.waiting_for_response = True
+    had_session = st.session_state.session_id is not None
+    
+    # Store the turn and start the request before rendering anything, since a
+    # rerun can land on any rendered element and must find the request running
+    add_message("user", user_input)
+    sent = send_message_to_api(user_input)
     
-    # Rerun to show the user message immediately
+    # Show the user message and stream the response below it
+    st.chat_message("user").write(user_input)
+    if sent:
+        receive_response()
+    
+    # Rerun once to replay the conversation from state, rerunning the whole
+    # app only if the message had to claim the warmed-up session
+    if had_session:
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:
+            # The input can arrive in a full-app run when Streamlit merges a
+            # pending fragment rerun into an app rerun
+            pass
     st.rerun()
 
-# Remove the custom display_message function - we'll use original Streamlit approach
+def display_messages(roles, contents):
+    """
+    Render chat messages.
+    
+    Runs of consecutive messages from the same role share one chat bubble,
+    separated by rules, to keep the number of elements per rerun down.
+    
+    Args:
+        roles (list): The role of each message, "user" or "assistant"
+        contents (list): The text of each message
+    """
+    with st.container():
+        for role, group in groupby(zip(roles, contents), key=itemgetter(0)):
+            # Assistant bubbles are styled by CUSTOM_CSS, so the content stays plain markdown
+            st.chat_message(role).markdown("\n\n---\n\n".join(content for _, content in group))
+
+@st.fragment
+def chat_panel():
+    """
+    Render the conversation and message input.
+    
+    Runs as a fragment so sending a message or toggling earlier messages
+    reruns only the chat area rather than the whole app.
+    """
+    # Display messages, only rendering older turns when asked for
+    roles = st.session_state.roles
+    contents = st.session_state.contents
+    earlier = len(roles) - MAX_VISIBLE
+    if earlier > 0:
+        if st.toggle(f"Show earlier messages ({earlier})", key="show_earlier"):
+            display_messages(roles[:earlier], contents[:earlier])
+            st.divider()
+    display_messages(roles[-MAX_VISIBLE:], contents[-MAX_VISIBLE:])
+
+    # Re-attach to a response that was still streaming when the script reran
+    if st.session_state.stream_thread is not None:
+        receive_response()
+
+    # Input for new messages
+    if st.session_state.session_id or st.session_state.pending_session is not None:  # Only show input if session exists or is starting
+        user_input = st.chat_input("Type your message...")
+        if user_input:
+            handle_user_input(user_input)
+    else:
+        st.info("👈 Create a session to start chatting")
+
+# Warm up a session in the background while the user reads and types
+if st.session_state.session_id is None:
+    if st.session_state.pending_session is None:
+        start_pending_session()
+    elif st.session_state.pending_session.done():
+        claim_pending_session()
+else:
+    keep_spare_session()
 
 # UI Components
 st.title("Fraud Support Agent")
@@ -168,19 +688,11 @@ with st.sidebar:
     if st.session_state.session_id:
         st.success(f"Active session: {st.session_state.session_id}")
         if st.button("➕ New Session"):
-            if st.session_state.user_id:
-                # Create a new session with the same user ID
-                create_session(AGENT_ID, st.session_state.user_id)
-            else:
-                create_session(AGENT_ID, f"user-{uuid.uuid4()}")
+            _new_session()
     else:
         st.warning("No active session")
         if st.button("➕ Create Session"):
-            if st.session_state.user_id:
-                # Create a new session with the same user ID
-                create_session(AGENT_ID, st.session_state.user_id)
-            else:
-                create_session(AGENT_ID, f"user-{uuid.uuid4()}")
+            _new_session()
     
     st.divider()
     st.caption("This app interacts with the Fraud RAG Agent via the ADK API Server.")
@@ -189,46 +701,4 @@ with st.sidebar:
 # Chat interface
 st.subheader("Conversation")
 
-# Display messages
-for i, msg in enumerate(st.session_state.messages):
-    if msg["role"] == "user":
-        st.chat_message("user").write(msg["content"])
-    else:
-        with st.chat_message("assistant"):
-            # Use custom styling for assistant response with proper HTML escaping
-            # import html
-            # escaped_content = html.escape(msg["content"]).replace('\n', '<br>')
-            st.markdown(f"""
-            <div class="assistant-response">
-                {msg["content"]}
-            </div>
-            """, unsafe_allow_html=True)      
-
-# Show typing indicator when waiting for response
-if st.session_state.waiting_for_response:
-    with st.chat_message("assistant"):
-        st.write("🤔 Thinking...")
-
-# Process API call if we're waiting for a response
-if st.session_state.waiting_for_response:
-    # Get the last user message to send to API
-    user_messages = [msg for msg in st.session_state.messages if msg["role"] == "user"]
-    if user_messages:
-        last_user_message = user_messages[-1]["content"]
-        
-        # Send message to API and get response
-        success = send_message_to_api(last_user_message)
-        
-        # Reset waiting state
-        st.session_state.waiting_for_response = False
-        
-        # Rerun to show the assistant's response
-        st.rerun()
-
-# Input for new messages
-if st.session_state.session_id:  # Only show input if session exists
-    user_input = st.chat_input("Type your message...")
-    if user_input and not st.session_state.waiting_for_response:
-        handle_user_input(user_input)
-else:
-    st.info("👈 Create a session to start chatting")
\ No newline at end of file
+chat_panel()